@@ -2,7 +2,55 @@
 import os
 import subprocess
 import sys
-import shutil
+import zipfile
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+# Bundle members that are already compressed and are stored as-is
+COMPRESSED_EXTENSIONS = ('.zip', '.pyz', '.gz', '.bz2', '.xz', '.png', '.jpg', '.icns', '.ico')
+
+# Bundle members larger than this are streamed into the archive instead of read into memory
+LARGE_MEMBER_SIZE = 8 * 1024 * 1024
+
+def read_member(file_path, arcname):
+    """Read a file for the archive along with its zip entry metadata."""
+    info = zipfile.ZipInfo.from_file(file_path, arcname)
+    with open(file_path, 'rb') as f:
+        return info, f.read()
+
+def member_compress_type(arcname):
+    """Pick the compression for a bundle member based on its extension."""
+    if arcname.lower().endswith(COMPRESSED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+def create_zip_archive(source_dir, zip_path):
+    """Zip the contents of source_dir, reading files in parallel and using fast compression."""
+    small_members = []
+    large_members = []
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            file_path = os.path.join(root, name)
+            member = (file_path, os.path.relpath(file_path, source_dir))
+            if os.path.getsize(file_path) > LARGE_MEMBER_SIZE:
+                large_members.append(member)
+            else:
+                small_members.append(member)
+    
+    workers = os.cpu_count() or 1
+    batch_size = workers * 4
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        # Read small files a batch at a time so only one batch is held in memory
+        for start in range(0, len(small_members), batch_size):
+            batch = small_members[start:start + batch_size]
+            for info, data in executor.map(lambda member: read_member(*member), batch):
+                info.compress_type = member_compress_type(info.filename)
+                zf.writestr(info, data, compresslevel=1)
+        
+        # Let zipfile stream large files from disk instead of reading them whole
+        for file_path, arcname in large_members:
+            zf.write(file_path, arcname, compress_type=member_compress_type(arcname), compresslevel=1)
 
 def build_executable():
     """Build the standalone executable using PyInstaller."""
@@ -12,18 +60,19 @@ def build_executable():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)  # Change to the script directory
     
-    # Install required packages
+    # Install required packages, skipping any that are already available
     print("Installing required packages...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "-e", "."])
+    if importlib.util.find_spec("PyInstaller") is None:
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
+    if importlib.util.find_spec("dropbox") is None or importlib.util.find_spec("dotenv") is None:
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "-e", "."])
     
-    # Build the executable
+    # Build the executable, reusing the PyInstaller cache unless a clean build is requested
     print("Building executable...")
-    subprocess.check_call([
-        "pyinstaller",
-        "--clean",
-        "dropbox_renamer.spec"
-    ])
+    command = ["pyinstaller", "--noconfirm", "dropbox_renamer.spec"]
+    if os.environ.get("CLEAN_BUILD"):
+        command.insert(1, "--clean")
+    subprocess.check_call(command)
     
     # Create dist directory if it doesn't exist
     dist_dir = os.path.join(script_dir, "dist")
@@ -39,7 +88,7 @@ def build_executable():
     
     # Create a zip file of the distribution
     print("Creating distribution package...")
-    shutil.make_archive(dest_dir, 'zip', source_dir)
+    create_zip_archive(source_dir, dest_dir + ".zip")
     
     print(f"\nBuild complete! The distribution package is in: {dest_dir}.zip")
     print("You can distribute this zip file along with the .env file.")
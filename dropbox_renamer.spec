@@ -7,7 +7,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['dropbox', 'python-dotenv'],
+    hiddenimports=['dropbox', 'python-dotenv', '_debug'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,111 @@
+"""
+Debugging helpers for inspecting a Dropbox account.
+
+These are only used with --debug and are imported lazily by the main script.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import dropbox
+
+def list_folder_contents(dbx, path):
+    """List the contents of a Dropbox folder for debugging."""
+    try:
+        print(f"\nAttempting to list contents of: {path}")
+        
+        # Try to get metadata first
+        try:
+            metadata = dbx.files_get_metadata(path)
+            print(f"Folder metadata: {metadata}")
+        except Exception as e:
+            print(f"Error getting metadata: {e}")
+        
+        # Then try to list contents
+        result = dbx.files_list_folder(path)
+        print(f"\nContents of {path}:")
+        for entry in result.entries:
+            print(f"- {entry.path_display} ({type(entry).__name__})")
+        return result.entries
+    except Exception as e:
+        print(f"Error listing folder {path}: {e}")
+        if hasattr(e, 'error'):
+            print(f"Error details: {e.error}")
+        return []
+
+def get_shared_folder_metadata(dbx, folder):
+    """Get the metadata of a shared folder, returning the error instead of raising it."""
+    try:
+        return dbx.sharing_get_folder_metadata(folder.shared_folder_id)
+    except Exception as e:
+        return e
+
+def list_all_namespaces_and_roots(dbx):
+    """List all available namespaces (personal, team, shared) and their root contents."""
+    print("\nEnumerating all Dropbox namespaces (personal, team, shared)...")
+    try:
+        # Print current user's root namespace
+        try:
+            account = dbx.users_get_current_account()
+            print(f"Current account: {account.name.display_name} (ID: {account.account_id})")
+        except Exception as e:
+            print(f"Could not get current account info: {e}")
+        
+        # List all shared folders
+        try:
+            shared_folders = dbx.sharing_list_folders().entries
+            
+            # Fetch the metadata of all shared folders concurrently
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                folder_metadata = list(executor.map(lambda folder: get_shared_folder_metadata(dbx, folder), shared_folders))
+            
+            print("\nShared folders:")
+            for folder, metadata in zip(shared_folders, folder_metadata):
+                print(f"- {folder.name} (shared_folder_id: {folder.shared_folder_id})")
+                if isinstance(metadata, Exception):
+                    print(f"  Could not get metadata for shared folder {folder.name}: {metadata}")
+                else:
+                    print(f"  Path: {getattr(metadata, 'path_lower', None)}")
+        except Exception as e:
+            print(f"Could not list shared folders: {e}")
+        
+        # Fallback: List root and mounted folders as before
+        print("\nRoot contents:")
+        try:
+            result = dbx.files_list_folder('')
+            for entry in result.entries:
+                print(f"- {entry.name} ({entry.path_display}) [{type(entry).__name__}]")
+        except Exception as e:
+            print(f"Could not list root contents: {e}")
+        print("\nMounted folders:")
+        try:
+            mounted = dbx.files_list_folder('', include_mounted_folders=True)
+            for entry in mounted.entries:
+                if isinstance(entry, dropbox.files.FolderMetadata):
+                    print(f"- [MOUNTED] {entry.name} -- API path: {entry.path_display}")
+        except Exception as e:
+            print(f"Could not list mounted folders: {e}")
+    except Exception as e:
+        print(f"Error enumerating namespaces: {e}")
+
+def list_app_folder_contents(dbx):
+    """List contents of the app folder."""
+    print("\nListing app folder contents:")
+    try:
+        # Get app info
+        app_info = dbx.check_app()
+        print(f"App folder name: {app_info.name}")
+        
+        # List app folder contents
+        result = dbx.files_list_folder('')
+        print("\nApp folder contents:")
+        for entry in result.entries:
+            print(f"- {entry.name} ({entry.path_display}) [{type(entry).__name__}]")
+            if isinstance(entry, dropbox.files.FolderMetadata):
+                try:
+                    subentries = dbx.files_list_folder(entry.path_display)
+                    print(f"  Contents of {entry.path_display}:")
+                    for subentry in subentries.entries:
+                        print(f"    - {subentry.name} ({subentry.path_display}) [{type(subentry).__name__}]")
+                except Exception as e:
+                    print(f"  Could not list contents of {entry.path_display}: {e}")
+    except Exception as e:
+        print(f"Error listing app folder contents: {e}")
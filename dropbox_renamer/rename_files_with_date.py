@@ -13,11 +13,136 @@ import argparse
 from pathlib import Path
 import dropbox
 from dropbox.exceptions import ApiError
+from dropbox.files import FileMetadata, FolderMetadata
+from urllib3.util.retry import Retry
 import tempfile
 import shutil
+import zipfile
 from dotenv import load_dotenv
 import sys
 import re
+import unicodedata
+import getpass
+import threading
+import time
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+
+# Messages from the download workers go through a queue so threads never block on stdout
+logger = logging.getLogger("dropbox_renamer")
+
+# Number of concurrent file downloads; high enough to hide network latency
+# while staying well below Dropbox's rate limits.
+DEFAULT_WORKERS = 16
+
+# Serializes appends to the shared log files from download worker threads
+_log_lock = threading.Lock()
+
+# Maximum downloads queued ahead of the workers before the folder listing waits
+MAX_PENDING_DOWNLOADS = 1024
+
+# Buffer size used when streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Dropbox limits for downloading a folder as a single zip archive
+ZIP_MAX_TOTAL_SIZE = 20 * 1024 ** 3
+ZIP_MAX_FILE_SIZE = 4 * 1024 ** 3
+ZIP_MAX_ENTRIES = 10000
+
+# Download a folder as a zip only if at least this share of its bytes is still missing locally
+ZIP_MIN_NEEDED_FRACTION = 0.5
+
+# Regular expression to match various date formats at the beginning of a filename:
+# - YYYYMMDD (e.g., 20240101)
+# - YYYYMMDD with space and time (e.g., 20240101 123456)
+# - YYYYMMDD with underscore and time (e.g., 20240101_123456)
+# - YYMMDD (e.g., 210928)
+DATE_PREFIX_RE = re.compile(r'^(?:(?:19|20)\d{6}(?:\s+\d{6}|_\d{6}|\s+|$)|(?:[0-9]{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])))')
+
+# Local directories already created during this run
+_ensured_dirs = set()
+_ensured_dirs_lock = threading.Lock()
+
+def start_log_listener():
+    """Route log messages through a queue drained by a background thread and return its listener."""
+    log_queue = queue.Queue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+class TokenBucket:
+    """Token bucket shared across threads that keeps Dropbox API calls under a transactions-per-second limit."""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Take a token, blocking until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # A negative balance reserves a future token, so waiting callers are served in order
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+class BoundedExecutor:
+    """Thread pool whose submit blocks while too many tasks are pending, so listing can't run far ahead of downloads."""
+    
+    def __init__(self, max_workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending = threading.BoundedSemaphore(max_pending)
+        # Only unfinished futures are kept, so memory stays bounded however many tasks run
+        self.futures = set()
+        self.futures_lock = threading.Lock()
+    
+    def submit(self, fn, *args):
+        """Submit a task, waiting for a free slot if the queue is full."""
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.pending.release()
+            raise
+        with self.futures_lock:
+            self.futures.add(future)
+        future.add_done_callback(self.task_done)
+        return future
+    
+    def task_done(self, future):
+        """Free the task's slot and report any error it raised."""
+        with self.futures_lock:
+            self.futures.discard(future)
+        self.pending.release()
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Error in download worker: {future.exception()}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # Drop queued tasks so an interrupt only waits for the ones already running
+            # (shutdown's cancel_futures needs Python 3.9)
+            with self.futures_lock:
+                queued = list(self.futures)
+            for future in queued:
+                future.cancel()
+        self.executor.shutdown(wait=True)
+        return False
 
 def create_timestamped_directory(base_dir):
     """Create a new directory with current timestamp."""
@@ -51,100 +176,73 @@ def create_timestamped_directory(base_dir):
 
 def ensure_directory_exists(directory):
     """Ensure the directory exists, create it if it doesn't."""
-    try:
-        os.makedirs(directory, exist_ok=True)
-        print(f"Ensuring directory exists: {directory}")
-        return True
-    except Exception as e:
-        print(f"Error creating directory {directory}: {str(e)}")
+    with _ensured_dirs_lock:
+        # Skip the makedirs syscalls for directories already ensured during this run
+        if directory in _ensured_dirs:
+            return True
+        try:
+            os.makedirs(directory, exist_ok=True)
+            logger.debug(f"Ensuring directory exists: {directory}")
+            _ensured_dirs.add(directory)
+            return True
+        except Exception as e:
+            logger.error(f"Error creating directory {directory}: {str(e)}")
+            return False
+
+def get_modified_timestamp(metadata):
+    """Get a file's Dropbox modification time as a POSIX timestamp."""
+    # The SDK returns naive datetimes in UTC
+    return metadata.server_modified.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def index_local_files(root):
+    """Map each directory under root to {file name: (size, whole-second mtime)} using one scandir walk."""
+    index = {}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        files = index[directory] = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_size, int(stat.st_mtime))
+        except OSError as e:
+            logger.error(f"Error scanning {directory}: {e}")
+    return index
+
+def is_already_downloaded(local_path, metadata, existing_files):
+    """Check if a previous run downloaded the file with the same size and modification time."""
+    if not existing_files:
         return False
+    return existing_files.get(os.path.basename(local_path)) == (metadata.size, int(get_modified_timestamp(metadata)))
 
-def has_date_prefix(name):
-    """Check if the filename already has a date prefix (YYYYMMDD or YYMMDD)."""
-    # Regular expression to match various date formats at the beginning of the filename:
-    # - YYYYMMDD (e.g., 20240101)
-    # - YYYYMMDD with space and time (e.g., 20240101 123456)
-    # - YYYYMMDD with underscore and time (e.g., 20240101_123456)
-    # - YYMMDD (e.g., 210928)
-    pattern = r'^(?:(?:19|20)\d{6}(?:\s+\d{6}|_\d{6}|\s+|$)|(?:[0-9]{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])))'
-    return bool(re.match(pattern, name))
-
-def get_folder_creation_date(dbx, path):
-    """Get the creation date of a folder by looking at its contents."""
-    try:
-        # List the folder contents
-        result = dbx.files_list_folder(path)
-        
-        # If folder has contents, find the oldest file
-        if result.entries:
-            oldest_date = None
-            for entry in result.entries:
-                if isinstance(entry, dropbox.files.FileMetadata):
-                    if oldest_date is None or entry.server_modified < oldest_date:
-                        oldest_date = entry.server_modified
-            
-            # If we found files, use the oldest file's date
-            if oldest_date:
-                return oldest_date
-        
-        # If no files found or empty folder, try looking at the folder info
-        folder_info = dbx.files_get_metadata(path)
-        
-        # Some Dropbox API versions might include a 'client_modified' field
-        if hasattr(folder_info, 'client_modified'):
-            return folder_info.client_modified
-            
-        # Try getting the shared folder info which might have creation date
+def preallocate_file(f, size):
+    """Reserve disk space for a download of known size where the platform supports it."""
+    if size > 0 and hasattr(os, 'posix_fallocate'):
         try:
-            shared_info = dbx.sharing_get_folder_metadata(path)
-            if hasattr(shared_info, 'time_created'):
-                return shared_info.time_created
-        except:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except OSError:
+            # Some filesystems don't support preallocation
             pass
-        
-        # If all else fails, use the current date
-        return datetime.datetime.now()
-        
-    except Exception as e:
-        print(f"Error getting folder creation date for {path}: {e}")
-        return datetime.datetime.now()
 
-def get_renamed_path(metadata, path, is_folder=False, dbx=None):
-    """Get the renamed path with date prefix."""
-    try:
-        # Get the original name
-        original_name = os.path.basename(path)
-        
-        # If the name already has a date prefix, don't modify it
-        if has_date_prefix(original_name):
-            print(f"File/folder already has date prefix: {original_name}")
-            return original_name
-        
-        # Get date for prefix
-        if is_folder:
-            # For folders, try to get creation date
-            if dbx:
-                date_obj = get_folder_creation_date(dbx, path)
-                date_prefix = date_obj.strftime("%y%m%d")
-                print(f"Using folder creation date for {path}: {date_prefix}")
-            else:
-                # Fallback to current date if dbx not provided
-                date_prefix = datetime.datetime.now().strftime("%y%m%d")
-        else:
-            # For files, use modification date from metadata
-            date_prefix = metadata.server_modified.strftime("%y%m%d")
-        
-        # Create new name with date prefix
-        new_name = f"{date_prefix} {original_name}"
-        
-        # If it's a folder, ensure it ends with a slash
-        if is_folder and not new_name.endswith('/'):
-            new_name += '/'
-            
-        return new_name
-    except Exception as e:
-        print(f"Error generating renamed path for {path}: {e}")
-        return os.path.basename(path)
+def set_modified_time(local_path, metadata):
+    """Set a downloaded file's modification time to its Dropbox modification time."""
+    mtime = get_modified_timestamp(metadata)
+    os.utime(local_path, (mtime, mtime))
+
+def has_date_prefix(name):
+    """Check if the filename already has a date prefix (YYYYMMDD or YYMMDD)."""
+    # Every supported prefix starts with an ASCII digit, so most names can skip the regex
+    if not '0' <= name[:1] <= '9':
+        return False
+    return DATE_PREFIX_RE.match(name) is not None
+
+def format_date_prefix(date):
+    """Format a date as a YYMMDD prefix without going through strftime."""
+    return f"{date.year % 100:02d}{date.month:02d}{date.day:02d}"
 
 def log_processed_folder(folder_path, download_dir):
     """Log a processed folder to the log file."""
@@ -155,44 +253,117 @@ def log_processed_folder(folder_path, download_dir):
 def log_renamed_file(original_path, new_name, download_dir):
     """Log a renamed file to the log file."""
     log_file = os.path.join(download_dir, 'renamed_files.log')
-    with open(log_file, 'a') as f:
+    with _log_lock, open(log_file, 'a') as f:
         f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {original_path} -> {new_name}\n")
 
-def download_and_rename_file(dbx, dropbox_path, local_dir):
-    """Download a file from Dropbox and rename it with its modification date if it doesn't already have a date prefix."""
+def get_local_file_path(metadata, local_dir):
+    """Get the local path for a Dropbox file, logging the rename if a date prefix is added."""
+    dropbox_path = metadata.path_display
+    
+    # Get the original name
+    original_name = metadata.name
+    
+    # Check if file already has a date prefix
+    if has_date_prefix(original_name):
+        logger.info(f"File already has date prefix, downloading with original name: {original_name}")
+        return local_dir + os.sep + original_name
+    
+    # Prefix the modification date directly; the name was checked above and
+    # local_dir is already a joined path, so plain concatenation is enough
+    new_name = f"{format_date_prefix(metadata.server_modified)} {original_name}"
+    # Log the renamed file
+    log_renamed_file(dropbox_path, new_name, os.path.dirname(local_dir))
+    return local_dir + os.sep + new_name
+
+def download_and_rename_file(dbx, metadata, local_path, existing_files=None, rate_limiter=None):
+    """Download a file from Dropbox to its renamed local path, computed while listing."""
+    # The metadata comes straight from the folder listing, so no extra lookup is needed
+    dropbox_path = metadata.path_display
     try:
-        # Get file metadata
-        metadata = dbx.files_get_metadata(dropbox_path)
-        
-        # Get the original name
-        original_name = os.path.basename(dropbox_path)
-        
-        # Check if file already has a date prefix
-        if has_date_prefix(original_name):
-            print(f"File already has date prefix, downloading with original name: {original_name}")
-            local_path = os.path.join(local_dir, original_name)
-        else:
-            # Generate new filename with date prefix
-            new_name = get_renamed_path(metadata, dropbox_path)
-            local_path = os.path.join(local_dir, new_name)
-            # Log the renamed file
-            log_renamed_file(dropbox_path, new_name, os.path.dirname(local_dir))
+        # Skip files left by a previous run
+        if is_already_downloaded(local_path, metadata, existing_files):
+            logger.info(f"Already downloaded, skipping: {local_path}")
+            return
         
         # Download the file
-        print(f"Downloading: {dropbox_path} -> {local_path}")
-        dbx.files_download_to_file(local_path, dropbox_path)
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        logger.info(f"Downloading: {dropbox_path} -> {local_path}")
+        _, response = dbx.files_download(dropbox_path)
+        with response, open(local_path, 'wb') as f:
+            preallocate_file(f, metadata.size)
+            # Let urllib3 undo any content encoding while streaming the raw body
+            response.raw.decode_content = True
+            try:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+            finally:
+                # Drop any preallocated space beyond what was received, so a
+                # failed download leaves a visibly short file
+                f.truncate()
+        
+        # Match the Dropbox modification time so later runs can recognize the file
+        set_modified_time(local_path, metadata)
         
     except Exception as e:
-        print(f"Error processing file {dropbox_path}: {e}")
+        logger.error(f"Error processing file {dropbox_path}: {e}")
+
+def get_zip_key(path):
+    """Key a Dropbox path for matching against zip member names, ignoring case and Unicode normalization."""
+    return unicodedata.normalize('NFC', path).lower()
+
+def download_and_extract_zip(dbx, dropbox_path, zip_files, rate_limiter=None):
+    """Download a Dropbox folder as one zip archive and extract the selected files with their renamed paths.
+    
+    Each file handled from the archive is removed from zip_files, so whatever is left still needs downloading.
+    """
+    # Zip members are named relative to the parent of the downloaded folder
+    parent_path = dropbox_path.rstrip('/').rpartition('/')[0]
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        zip_path = os.path.join(temp_dir, 'download.zip')
+        logger.info(f"Downloading folder as zip archive: {dropbox_path}")
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        dbx.files_download_zip_to_file(zip_path, dropbox_path)
+        
+        with zipfile.ZipFile(zip_path) as zf:
+            for member in zf.infolist():
+                if member.is_dir():
+                    continue
+                
+                # Skip members from ignored or non-allowed folders
+                key = get_zip_key(f"{parent_path}/{member.filename}")
+                target = zip_files.get(key)
+                if target is None:
+                    continue
+                
+                metadata, local_path, existing_files, account = target
+                try:
+                    if is_already_downloaded(local_path, metadata, existing_files):
+                        logger.info(f"Already downloaded, skipping: {local_path}")
+                    else:
+                        logger.info(f"Extracting: {metadata.path_display} -> {local_path}")
+                        with zf.open(member) as src, open(local_path, 'wb') as dst:
+                            shutil.copyfileobj(src, dst)
+                        set_modified_time(local_path, metadata)
+                except Exception as e:
+                    logger.error(f"Error extracting file {metadata.path_display}: {e}")
+                    continue
+                
+                del zip_files[key]
+                if account is not None:
+                    account['end'] = datetime.datetime.now()
 
 def read_allowed_folders(file_path='./dropbox_renamer/dropbox_files.txt'):
     """Read the list of allowed folder names from dropbox_files.txt."""
     try:
-        if not os.path.exists(file_path):
+        try:
+            f = open(file_path, 'r')
+        except FileNotFoundError:
             print(f"Warning: {file_path} not found. Will process all folders.")
             return None
             
-        with open(file_path, 'r') as f:
+        with f:
             # Read lines and strip whitespace, skip empty lines
             folders = [line.strip() for line in f.readlines() if line.strip()]
             
@@ -209,11 +380,13 @@ def read_allowed_folders(file_path='./dropbox_renamer/dropbox_files.txt'):
 def read_ignored_folders(file_path='./dropbox_ignore.txt'):
     """Read the list of folders to ignore from dropbox_ignore.txt."""
     try:
-        if not os.path.exists(file_path):
+        try:
+            f = open(file_path, 'r')
+        except FileNotFoundError:
             print(f"Warning: {file_path} not found. No folders will be ignored.")
             return set()
             
-        with open(file_path, 'r') as f:
+        with f:
             # Read lines and strip whitespace, skip empty lines
             folders = {line.strip() for line in f.readlines() if line.strip()}
             
@@ -248,166 +421,215 @@ def log_processing_time(account_name, start_time, end_time, download_dir):
     with open(log_file, 'a') as f:
         f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {account_name}: {format_duration(seconds)}\n")
 
-def process_dropbox_folder(dbx, dropbox_path, local_dir, allowed_folders=None, ignored_folders=None, account_start_time=None, total_accounts=None, processed_accounts=None):
-    """Process a Dropbox folder recursively."""
+def iter_entries(dbx, path, recursive=False, rate_limiter=None):
+    """Yield all entries of a Dropbox folder listing, following pagination."""
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    result = dbx.files_list_folder(path, recursive=recursive)
+    yield from result.entries
+    
+    # Handle pagination if there are more entries
+    while result.has_more:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        result = dbx.files_list_folder_continue(result.cursor)
+        yield from result.entries
+
+def get_skipped_folder(path_parts, root_depth, allowed_folders=None, ignored_folders=None):
+    """Return the path parts of the first folder below the root that should be skipped, or None."""
+    for depth in range(root_depth + 1, len(path_parts) + 1):
+        folder_parts = path_parts[:depth]
+        
+        # Skip folders that are in the ignore list
+        if ignored_folders and folder_parts[-1] in ignored_folders:
+            return folder_parts
+        
+        # If we have a list of allowed folders, check if any part of the path matches one
+        if allowed_folders is not None and not any(folder in folder_parts for folder in allowed_folders):
+            return folder_parts
+    return None
+
+def mark_account_done(account):
+    """Return a future callback that records when a download for the account finished."""
+    def callback(future):
+        with account['done']:
+            account['end'] = datetime.datetime.now()
+            account['pending'] -= 1
+            account['done'].notify_all()
+    return callback
+
+def wait_for_account(account):
+    """Block until every download submitted for the account has finished."""
+    with account['done']:
+        account['done'].wait_for(lambda: account['pending'] == 0)
+
+def submit_download(dbx, executor, metadata, local_path, existing_files=None, account=None, rate_limiter=None):
+    """Submit a file download to the executor, attributing it to its account folder if any."""
+    future = executor.submit(download_and_rename_file, dbx, metadata, local_path, existing_files, rate_limiter)
+    if account is not None:
+        # Count downloads per account instead of keeping their futures
+        with account['done']:
+            account['pending'] += 1
+        future.add_done_callback(mark_account_done(account))
+
+def process_dropbox_folder(dbx, dropbox_path, local_dir, executor, allowed_folders=None, ignored_folders=None, total_accounts=None, processed_accounts=None, use_zip=False, rate_limiter=None, local_files=None):
+    """Process a Dropbox folder and all of its subfolders from a single recursive listing."""
     try:
         # Log the processed folder
         log_processed_folder(dropbox_path, local_dir)
         
-        # List all entries in the folder
-        result = dbx.files_list_folder(dropbox_path)
+        root_depth = len(dropbox_path.strip('/').split('/'))
+        accounts = {}
         
-        # Process all entries
-        for entry in result.entries:
+        # Files already present in each local directory, from the index built before the walk
+        if local_files is None:
+            local_files = {}
+        
+        # Local directory for each Dropbox folder seen so far, or None if the folder is skipped
+        folder_targets = {}
+        
+        # Files held back for a single zip download, with the totals used to check Dropbox's zip limits
+        zip_files = {}
+        zip_entries = 0
+        zip_total_size = 0
+        zip_largest_file = 0
+        zip_needed_size = 0
+        
+        # List the whole tree at once instead of one listing per subfolder
+        for entry in iter_entries(dbx, dropbox_path, recursive=True, rate_limiter=rate_limiter):
             entry_path = entry.path_display
+            path_parts = entry_path.strip('/').split('/')
             
-            if isinstance(entry, dropbox.files.FileMetadata):
-                # Get the last folder name from the path
-                path_parts = entry_path.strip('/').split('/')
-                if len(path_parts) > 1:  # Make sure we have at least a folder and a file
-                    account_folder = path_parts[-2]  # Get the last folder name (second to last part)
-                    account_dir = os.path.join(local_dir, account_folder)
-                    ensure_directory_exists(account_dir)
-                    download_and_rename_file(dbx, entry_path, account_dir)
-                else:
-                    # If path is not deep enough, download to current directory
-                    download_and_rename_file(dbx, entry_path, local_dir)
-            elif isinstance(entry, dropbox.files.FolderMetadata):
-                # Skip folders that are in the ignore list
-                folder_name = os.path.basename(entry_path)
-                if ignored_folders and folder_name in ignored_folders:
-                    print(f"Skipping ignored folder: {entry_path}")
+            # Listing results are never subclassed, so an exact type check avoids walking the MRO
+            entry_type = type(entry)
+            
+            if use_zip:
+                zip_entries += 1
+                if entry_type is FileMetadata:
+                    zip_total_size += entry.size
+                    zip_largest_file = max(zip_largest_file, entry.size)
+            
+            # The listing includes the root folder itself
+            if len(path_parts) <= root_depth:
+                continue
+            
+            if entry_type is FileMetadata:
+                # Resolve each parent folder once; files in the same folder share the result
+                parent_folder = entry.path_lower.rpartition('/')[0]
+                if parent_folder not in folder_targets:
+                    if get_skipped_folder(path_parts[:-1], root_depth, allowed_folders, ignored_folders):
+                        # Skip files inside ignored or non-allowed folders
+                        target_dir = None
+                    elif len(path_parts) > 1:  # Make sure we have at least a folder and a file
+                        account_folder = path_parts[-2]  # Get the last folder name (second to last part)
+                        target_dir = os.path.join(local_dir, account_folder)
+                    else:
+                        # If path is not deep enough, download to current directory
+                        target_dir = local_dir
+                    
+                    # Create each directory once; directories missing from the index start empty
+                    if target_dir is not None:
+                        ensure_directory_exists(target_dir)
+                        local_files.setdefault(target_dir, {})
+                    folder_targets[parent_folder] = target_dir
+                
+                target_dir = folder_targets[parent_folder]
+                if target_dir is None:
                     continue
                 
-                # If we have a list of allowed folders, check if this folder should be processed
-                if allowed_folders is not None:
-                    # Get the full path components
-                    path_parts = entry_path.strip('/').split('/')
-                    # Check if any part of the path matches an allowed folder
-                    if not any(folder in path_parts for folder in allowed_folders):
-                        print(f"Skipping folder not in allowed list: {entry_path}")
+                # Work out the renamed local path here, in the same pass as the listing,
+                # so download workers only have to transfer the file
+                local_path = get_local_file_path(entry, target_dir)
+                
+                # Attribute the download to its account folder, if any
+                account = accounts.get('/' + '/'.join(path_parts[:5]).lower()) if len(path_parts) > 5 else None
+                if use_zip:
+                    # Leave out files from a previous run so they don't count towards fetching the zip
+                    if is_already_downloaded(local_path, entry, local_files[target_dir]):
+                        logger.info(f"Already downloaded, skipping: {local_path}")
                         continue
+                    zip_files[get_zip_key(entry_path)] = (entry, local_path, local_files[target_dir], account)
+                    zip_needed_size += entry.size
+                else:
+                    submit_download(dbx, executor, entry, local_path, local_files[target_dir], account, rate_limiter)
+            elif entry_type is FolderMetadata:
+                folder_name = entry.name
+                skipped = get_skipped_folder(path_parts, root_depth, allowed_folders, ignored_folders)
+                if skipped:
+                    # Only report the folder that caused the skip, not its descendants
+                    if skipped == path_parts:
+                        if ignored_folders and folder_name in ignored_folders:
+                            logger.info(f"Skipping ignored folder: {entry_path}")
+                        else:
+                            logger.info(f"Skipping folder not in allowed list: {entry_path}")
+                    continue
                 
-                # If this is an account folder (direct child of Principal Protection), log its processing time
-                if len(entry_path.strip('/').split('/')) == 5:  # All files/A Work Documents/A WORK Documents/Principal Protection/Account Name
+                log_processed_folder(entry_path, local_dir)
+                
+                # If this is an account folder (direct child of Principal Protection), track its processing time
+                if len(path_parts) == 5:  # All files/A Work Documents/A WORK Documents/Principal Protection/Account Name
                     account_start = datetime.datetime.now()
+                    accounts[entry.path_lower] = {'name': folder_name, 'start': account_start, 'end': account_start, 'pending': 0, 'done': threading.Condition()}
                     if processed_accounts is not None:
                         processed_accounts[0] += 1
                         progress = (processed_accounts[0] / total_accounts[0]) * 100
-                        print(f"\nProcessing account {processed_accounts[0]}/{total_accounts[0]} ({progress:.1f}%): {folder_name}")
-                    process_dropbox_folder(dbx, entry_path, local_dir, allowed_folders, ignored_folders, account_start, total_accounts, processed_accounts)
-                    account_end = datetime.datetime.now()
-                    duration = account_end - account_start
-                    print(f"Completed {folder_name} in {format_duration(duration.total_seconds())}")
-                    log_processing_time(folder_name, account_start, account_end, local_dir)
-                else:
-                    # Process the folder with the same local directory
-                    process_dropbox_folder(dbx, entry_path, local_dir, allowed_folders, ignored_folders, account_start_time, total_accounts, processed_accounts)
-        
-        # Handle pagination if there are more entries
-        while result.has_more:
-            result = dbx.files_list_folder_continue(result.cursor)
-            for entry in result.entries:
-                entry_path = entry.path_display
-                
-                if isinstance(entry, dropbox.files.FileMetadata):
-                    # Get the last folder name from the path
-                    path_parts = entry_path.strip('/').split('/')
-                    if len(path_parts) > 1:  # Make sure we have at least a folder and a file
-                        account_folder = path_parts[-2]  # Get the last folder name (second to last part)
-                        account_dir = os.path.join(local_dir, account_folder)
-                        ensure_directory_exists(account_dir)
-                        download_and_rename_file(dbx, entry_path, account_dir)
-                    else:
-                        # If path is not deep enough, download to current directory
-                        download_and_rename_file(dbx, entry_path, local_dir)
-                elif isinstance(entry, dropbox.files.FolderMetadata):
-                    # Skip folders that are in the ignore list
-                    folder_name = os.path.basename(entry_path)
-                    if ignored_folders and folder_name in ignored_folders:
-                        print(f"Skipping ignored folder: {entry_path}")
-                        continue
-                    
-                    # If we have a list of allowed folders, check if this folder should be processed
-                    if allowed_folders is not None:
-                        # Get the full path components
-                        path_parts = entry_path.strip('/').split('/')
-                        # Check if any part of the path matches an allowed folder
-                        if not any(folder in path_parts for folder in allowed_folders):
-                            print(f"Skipping folder not in allowed list: {entry_path}")
-                            continue
-                    
-                    # If this is an account folder (direct child of Principal Protection), log its processing time
-                    if len(entry_path.strip('/').split('/')) == 5:  # All files/A Work Documents/A WORK Documents/Principal Protection/Account Name
-                        account_start = datetime.datetime.now()
-                        if processed_accounts is not None:
-                            processed_accounts[0] += 1
-                            progress = (processed_accounts[0] / total_accounts[0]) * 100
-                            print(f"\nProcessing account {processed_accounts[0]}/{total_accounts[0]} ({progress:.1f}%): {folder_name}")
-                        process_dropbox_folder(dbx, entry_path, local_dir, allowed_folders, ignored_folders, account_start_time, total_accounts, processed_accounts)
-                        account_end = datetime.datetime.now()
-                        duration = account_end - account_start
-                        print(f"Completed {folder_name} in {format_duration(duration.total_seconds())}")
-                        log_processing_time(folder_name, account_start, account_end, local_dir)
-                    else:
-                        # Process the folder with the same local directory
-                        process_dropbox_folder(dbx, entry_path, local_dir, allowed_folders, ignored_folders, account_start_time, total_accounts, processed_accounts)
+                        logger.info(f"\nProcessing account {processed_accounts[0]}/{total_accounts[0]} ({progress:.1f}%): {folder_name}")
+        
+        if zip_files:
+            # The zip includes every entry under the folder, skipped and already downloaded ones too
+            if not (zip_entries < ZIP_MAX_ENTRIES and zip_total_size < ZIP_MAX_TOTAL_SIZE and zip_largest_file < ZIP_MAX_FILE_SIZE):
+                logger.info(f"Folder {dropbox_path} exceeds Dropbox zip limits, downloading files individually")
+            elif zip_needed_size < zip_total_size * ZIP_MIN_NEEDED_FRACTION:
+                logger.info(f"Most of {dropbox_path} is already downloaded, downloading the rest individually")
+            else:
+                try:
+                    download_and_extract_zip(dbx, dropbox_path, zip_files, rate_limiter)
+                    for metadata, _, _, _ in zip_files.values():
+                        logger.error(f"Not extracted from zip, downloading individually: {metadata.path_display}")
+                except Exception as e:
+                    logger.error(f"Error downloading {dropbox_path} as zip, falling back to per-file downloads: {e}")
+            
+            for metadata, local_path, existing_files, account in zip_files.values():
+                submit_download(dbx, executor, metadata, local_path, existing_files, account, rate_limiter)
+        
+        # Log each account once all of its downloads have finished
+        for account in accounts.values():
+            wait_for_account(account)
+            duration = account['end'] - account['start']
+            logger.info(f"Completed {account['name']} in {format_duration(duration.total_seconds())}")
+            log_processing_time(account['name'], account['start'], account['end'], local_dir)
                     
     except Exception as e:
-        print(f"Error processing folder {dropbox_path}: {e}")
+        logger.error(f"Error processing folder {dropbox_path}: {e}")
 
-def count_account_folders(dbx, dropbox_path, allowed_folders=None, ignored_folders=None):
+def count_account_folders(dbx, dropbox_path, allowed_folders=None, ignored_folders=None, rate_limiter=None):
     """Count the number of account folders that will be processed."""
     try:
         count = 0
-        result = dbx.files_list_folder(dropbox_path)
         
-        for entry in result.entries:
-            if isinstance(entry, dropbox.files.FolderMetadata):
-                entry_path = entry.path_display
-                folder_name = os.path.basename(entry_path)
-                
-                # Skip ignored folders
-                if ignored_folders and folder_name in ignored_folders:
-                    continue
-                
-                # Check if folder is in allowed list
-                if allowed_folders is not None:
-                    path_parts = entry_path.strip('/').split('/')
-                    if not any(folder in path_parts for folder in allowed_folders):
-                        continue
-                
-                # If this is an account folder, increment count
-                if len(entry_path.strip('/').split('/')) == 5:
-                    count += 1
-                
-                # Recursively count in subfolders
-                count += count_account_folders(dbx, entry_path, allowed_folders, ignored_folders)
-        
-        # Handle pagination
-        while result.has_more:
-            result = dbx.files_list_folder_continue(result.cursor)
-            for entry in result.entries:
-                if isinstance(entry, dropbox.files.FolderMetadata):
+        # Walk the folders with an explicit stack instead of recursion
+        stack = [dropbox_path]
+        while stack:
+            for entry in iter_entries(dbx, stack.pop(), rate_limiter=rate_limiter):
+                if type(entry) is FolderMetadata:
                     entry_path = entry.path_display
-                    folder_name = os.path.basename(entry_path)
+                    folder_name = entry.name
                     
                     # Skip ignored folders
                     if ignored_folders and folder_name in ignored_folders:
                         continue
                     
                     # Check if folder is in allowed list
+                    path_parts = entry_path.strip('/').split('/')
                     if allowed_folders is not None:
-                        path_parts = entry_path.strip('/').split('/')
                         if not any(folder in path_parts for folder in allowed_folders):
                             continue
                     
-                    # If this is an account folder, increment count
-                    if len(entry_path.strip('/').split('/')) == 5:
+                    # If this is an account folder, count it; nothing below it can be another account
+                    if len(path_parts) == 5:
                         count += 1
-                    
-                    # Recursively count in subfolders
-                    count += count_account_folders(dbx, entry_path, allowed_folders, ignored_folders)
+                    elif len(path_parts) < 5:
+                        stack.append(entry_path)
         
         return count
     except Exception as e:
@@ -432,42 +654,21 @@ def get_access_token(env_file):
     # Try to get token from environment
     access_token = os.getenv('DROPBOX_ACCESS_TOKEN')
     
-    # If no token found, prompt user
-    if not access_token:
-        print("\nDropbox Access Token not found.")
-        print("Please follow these steps:")
-        print("1. Create a file named 'token.txt' in the current directory")
-        print("2. Paste your Dropbox access token into this file")
-        print("3. Save the file")
-        print("4. Press Enter to continue...")
-        
-        # Wait for user to create the file
-        input()
-        
-        try:
-            # Read token from file
-            if os.path.exists('token.txt'):
-                with open('token.txt', 'r') as f:
-                    access_token = f.read().strip()
-                
-                # Delete the token file for security
-                os.remove('token.txt')
-                
-                if not access_token:
-                    print("Error: Token file is empty")
-                    return get_access_token(env_file)
-                
-                print(f"Token length: {len(access_token)}")
-                
-                # Update .env file with the new token
-                update_env_file(env_file, access_token)
-            else:
-                print("Error: token.txt file not found")
-                return get_access_token(env_file)
-                
-        except Exception as e:
-            print(f"Error reading token: {e}")
-            return get_access_token(env_file)
+    if access_token:
+        return access_token
+    
+    # If no token found, prompt user until one is entered
+    print("\nDropbox Access Token not found.")
+    while True:
+        access_token = getpass.getpass("Paste Dropbox access token and press Enter: ").strip()
+        if access_token:
+            break
+        print("Error: No access token entered")
+    
+    print(f"Token length: {len(access_token)}")
+    
+    # Update .env file with the new token
+    update_env_file(env_file, access_token)
     
     return access_token
 
@@ -495,78 +696,28 @@ def clean_dropbox_path(path):
     if path.startswith('/All files'):
         path = path[10:]  # Remove '/All files' prefix
     
-    # Try to normalize the path
+    # Normalize the path; Dropbox paths are case-insensitive so no case variations are needed
     path_parts = [p for p in path.split('/') if p]
-    
-    # Handle case sensitivity issues by trying different case combinations
     if len(path_parts) > 0:
-        # Try with original case first
         path = '/' + '/'.join(path_parts)
-        print(f"Trying path with original case: {path}")
-        
-        # If that fails, try with lowercase
-        path_lower = '/' + '/'.join(p.lower() for p in path_parts)
-        print(f"Trying path with lowercase: {path_lower}")
-        
-        # If that fails, try with uppercase
-        path_upper = '/' + '/'.join(p.upper() for p in path_parts)
-        print(f"Trying path with uppercase: {path_upper}")
     
     print(f"Final cleaned path: {path}")
     return path
 
-def list_folder_contents(dbx, path):
-    """List the contents of a Dropbox folder for debugging."""
-    try:
-        print(f"\nAttempting to list contents of: {path}")
-        
-        # Try to get metadata first
-        try:
-            metadata = dbx.files_get_metadata(path)
-            print(f"Folder metadata: {metadata}")
-        except Exception as e:
-            print(f"Error getting metadata: {e}")
-        
-        # Then try to list contents
-        result = dbx.files_list_folder(path)
-        print(f"\nContents of {path}:")
-        for entry in result.entries:
-            print(f"- {entry.path_display} ({type(entry).__name__})")
-        return result.entries
-    except Exception as e:
-        print(f"Error listing folder {path}: {e}")
-        if hasattr(e, 'error'):
-            print(f"Error details: {e.error}")
-        return []
-
 def find_folder_path(dbx, target_folder):
     """Try to find the correct path to a folder by searching from root."""
     print("\nSearching for folder path...")
     
-    # First try the exact path
+    # First try the exact path; Dropbox matches paths case-insensitively
     try:
         metadata = dbx.files_get_metadata(target_folder)
         if isinstance(metadata, dropbox.files.FolderMetadata):
             return target_folder
-    except:
-        pass
-    
-    # Try different case variations
-    path_parts = [p for p in target_folder.split('/') if p]
-    variations = [
-        '/' + '/'.join(path_parts),  # Original case
-        '/' + '/'.join(p.lower() for p in path_parts),  # Lowercase
-        '/' + '/'.join(p.upper() for p in path_parts),  # Uppercase
-    ]
-    
-    for variation in variations:
-        try:
-            metadata = dbx.files_get_metadata(variation)
-            if isinstance(metadata, dropbox.files.FolderMetadata):
-                print(f"Found matching folder: {variation}")
-                return variation
-        except:
-            continue
+    except ApiError as e:
+        if not (e.error.is_path() and e.error.get_path().is_not_found()):
+            print(f"Error getting metadata for {target_folder}: {e}")
+    except Exception as e:
+        print(f"Error getting metadata for {target_folder}: {e}")
     
     # If exact match fails, try searching from root
     try:
@@ -584,75 +735,6 @@ def find_folder_path(dbx, target_folder):
     
     return None
 
-def list_all_namespaces_and_roots(dbx):
-    """List all available namespaces (personal, team, shared) and their root contents."""
-    print("\nEnumerating all Dropbox namespaces (personal, team, shared)...")
-    try:
-        # Print current user's root namespace
-        try:
-            account = dbx.users_get_current_account()
-            print(f"Current account: {account.name.display_name} (ID: {account.account_id})")
-        except Exception as e:
-            print(f"Could not get current account info: {e}")
-        
-        # List all shared folders
-        try:
-            shared_folders = dbx.sharing_list_folders().entries
-            print("\nShared folders:")
-            for folder in shared_folders:
-                print(f"- {folder.name} (shared_folder_id: {folder.shared_folder_id})")
-                # Try to get the folder metadata and path
-                try:
-                    metadata = dbx.sharing_get_folder_metadata(folder.shared_folder_id)
-                    print(f"  Path: {getattr(metadata, 'path_lower', None)}")
-                except Exception as e:
-                    print(f"  Could not get metadata for shared folder {folder.name}: {e}")
-        except Exception as e:
-            print(f"Could not list shared folders: {e}")
-        
-        # Fallback: List root and mounted folders as before
-        print("\nRoot contents:")
-        try:
-            result = dbx.files_list_folder('')
-            for entry in result.entries:
-                print(f"- {entry.name} ({entry.path_display}) [{type(entry).__name__}]")
-        except Exception as e:
-            print(f"Could not list root contents: {e}")
-        print("\nMounted folders:")
-        try:
-            mounted = dbx.files_list_folder('', include_mounted_folders=True)
-            for entry in mounted.entries:
-                if isinstance(entry, dropbox.files.FolderMetadata):
-                    print(f"- [MOUNTED] {entry.name} -- API path: {entry.path_display}")
-        except Exception as e:
-            print(f"Could not list mounted folders: {e}")
-    except Exception as e:
-        print(f"Error enumerating namespaces: {e}")
-
-def list_app_folder_contents(dbx):
-    """List contents of the app folder."""
-    print("\nListing app folder contents:")
-    try:
-        # Get app info
-        app_info = dbx.check_app()
-        print(f"App folder name: {app_info.name}")
-        
-        # List app folder contents
-        result = dbx.files_list_folder('')
-        print("\nApp folder contents:")
-        for entry in result.entries:
-            print(f"- {entry.name} ({entry.path_display}) [{type(entry).__name__}]")
-            if isinstance(entry, dropbox.files.FolderMetadata):
-                try:
-                    subentries = dbx.files_list_folder(entry.path_display)
-                    print(f"  Contents of {entry.path_display}:")
-                    for subentry in subentries.entries:
-                        print(f"    - {subentry.name} ({subentry.path_display}) [{type(subentry).__name__}]")
-                except Exception as e:
-                    print(f"  Could not list contents of {entry.path_display}: {e}")
-    except Exception as e:
-        print(f"Error listing app folder contents: {e}")
-
 def collect_folder_stats(download_dir):
     """Collect statistics about processed folders and files."""
     stats = {}
@@ -714,9 +796,20 @@ def main():
                       help='Path to .env file (default: .env)')
     parser.add_argument('--debug', action='store_true',
                       help='List folder contents for debugging')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                      help=f'Number of concurrent file downloads (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--tpslimit', type=float, default=0,
+                      help='Maximum Dropbox API calls per second across all workers, e.g. 12 (default: no limit)')
+    parser.add_argument('--resume-dir', '-r',
+                      help='Existing download directory to resume; files already downloaded are skipped')
+    parser.add_argument('--zip', action='store_true',
+                      help='Download the folder as a single zip archive when it is within Dropbox zip limits')
     
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
     
+    listener = start_log_listener()
     try:
         # Start timing the total process
         total_start_time = datetime.datetime.now()
@@ -736,12 +829,27 @@ def main():
         # Create base directory if it doesn't exist
         ensure_directory_exists(args.directory)
         
-        # Create timestamped directory for this download
-        download_dir = create_timestamped_directory(args.directory)
-        print(f"\nCreated download directory: {download_dir}")
+        if args.resume_dir:
+            # Continue a previous download, skipping files that are already there
+            if not os.path.isdir(args.resume_dir):
+                print(f"Error: resume directory {args.resume_dir} does not exist")
+                return
+            download_dir = args.resume_dir
+            print(f"\nResuming download in: {download_dir}")
+        else:
+            # Create timestamped directory for this download
+            download_dir = create_timestamped_directory(args.directory)
+            print(f"\nCreated download directory: {download_dir}")
+        
+        # Initialize Dropbox client with a shorter timeout than the SDK default and a
+        # connection pool large enough for every download worker plus the listing thread
+        session = dropbox.create_session(max_connections=args.workers + 1)
+        
+        # The SDK retries rate limits and server errors itself but not dropped connections,
+        # so let the pool retry those with backoff on the SDK's own (certificate-pinned) adapter
+        session.get_adapter('https://').max_retries = Retry(total=5, connect=5, read=0, status=0, backoff_factor=0.5)
         
-        # Initialize Dropbox client with a longer timeout
-        dbx = dropbox.Dropbox(access_token, timeout=30)
+        dbx = dropbox.Dropbox(access_token, session=session, timeout=30)
         
         # Verify the token works and get account info
         try:
@@ -754,15 +862,21 @@ def main():
             print("Please check your access token and try again.")
             return
         
-        # Debug: List app folder contents
         if args.debug:
+            # The debug helpers are only needed with --debug, so import them lazily
+            try:
+                from dropbox_renamer import _debug
+            except ImportError:
+                # Running as a standalone script rather than an installed package
+                import _debug
+            
+            # Debug: List app folder contents
             print("\nListing app folder contents:")
-            list_app_folder_contents(dbx)
-        
-        # Debug: List all namespaces and their root contents
-        if args.debug:
+            _debug.list_app_folder_contents(dbx)
+            
+            # Debug: List all namespaces and their root contents
             print("\nListing all namespaces and their root contents:")
-            list_all_namespaces_and_roots(dbx)
+            _debug.list_all_namespaces_and_roots(dbx)
         
         # Try to find the correct folder path
         found_path = find_folder_path(dbx, dropbox_path)
@@ -772,15 +886,23 @@ def main():
         else:
             print(f"\nCould not find exact folder path. Will try with original path: {dropbox_path}")
         
+        # Share one token bucket across listing and download calls, allowing bursts of up to a second's worth
+        rate_limiter = TokenBucket(args.tpslimit, max(args.tpslimit, 1)) if args.tpslimit > 0 else None
+        
         # Count total number of account folders to process
         print("\nCounting account folders to process...")
-        total_accounts = [count_account_folders(dbx, dropbox_path, allowed_folders, ignored_folders)]
+        total_accounts = [count_account_folders(dbx, dropbox_path, allowed_folders, ignored_folders, rate_limiter)]
         processed_accounts = [0]
         print(f"Found {total_accounts[0]} account folders to process")
         
         # Process the Dropbox folder
         print(f"\nProcessing Dropbox folder: {dropbox_path}")
-        process_dropbox_folder(dbx, dropbox_path, download_dir, allowed_folders, ignored_folders, None, total_accounts, processed_accounts)
+        # Index files from the previous run once instead of checking each download separately
+        local_files = index_local_files(download_dir) if args.resume_dir else {}
+        
+        # Leaving the block waits for the remaining downloads; their errors are logged as they finish
+        with BoundedExecutor(args.workers, MAX_PENDING_DOWNLOADS) as executor:
+            process_dropbox_folder(dbx, dropbox_path, download_dir, executor, allowed_folders, ignored_folders, total_accounts, processed_accounts, args.zip, rate_limiter, local_files)
         
         # Log total processing time
         total_end_time = datetime.datetime.now()
@@ -792,6 +914,9 @@ def main():
             f.write("\n" + "-" * 80 + "\n")
             f.write(f"Total processing time: {total_time_str}\n")
         
+        # Let queued log messages print before the summary
+        listener.queue.join()
+        
         # Collect and display summary statistics
         stats = collect_folder_stats(download_dir)
         display_summary(stats, total_time_str)
@@ -802,6 +927,8 @@ def main():
         print(f"Error: {e}")
         if hasattr(e, 'error'):
             print(f"Error details: {e.error}")
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file